@@ -5,15 +5,45 @@ Purpose: Backend routes for Dashboard, Inventory CRUD, Billing, and Seasonal Rec
 """
 
 from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask.json.provider import JSONProvider
 from models import db, Medicine, Sales, Supplier, init_db
 from config import Config
+import hashlib
+import json
+import time
 from datetime import datetime, date, timedelta
-from sqlalchemy import or_
+from functools import lru_cache
+from sqlalchemy import func, or_, select, text, update
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - stdlib json fallback
+    orjson = None
+
+class ORJSONProvider(JSONProvider):
+    """JSON provider backed by orjson (C-implemented, ~5x faster dumps)"""
+
+    def dumps(self, obj, **kwargs):
+        # orjson has no equivalent for stdlib kwargs like default= or
+        # object_hook=; callers that need them (e.g. the session
+        # cookie serializer) must get stdlib behavior
+        if kwargs:
+            return json.dumps(obj, **kwargs)
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return json.loads(s, **kwargs)
+        return orjson.loads(s)
 
 # Initialize Flask application
 app = Flask(__name__)
 app.config.from_object(Config)
 
+# Use orjson for API responses when available
+if orjson is not None:
+    app.json = ORJSONProvider(app)
+
 # Initialize database
 init_db(app)
 
@@ -21,36 +51,63 @@ init_db(app)
 # HELPER FUNCTIONS
 # ============================================================================
 
+@lru_cache(maxsize=16)
+def _season_for(month):
+    """Resolves a month number to its season (memoized - 12 inputs)"""
+    return Config.MONTH_TO_SEASON.get(month, 'Winter')
+
 def get_current_season():
     """Returns current season based on month"""
-    current_month = datetime.now().month
-    return Config.MONTH_TO_SEASON.get(current_month, 'Winter')
+    return _season_for(datetime.now().month)
+
+# In-process TTL cache for dashboard stats - they change on the order
+# of seconds, so recomputing on every hit is wasted DB work
+_dashboard_cache = {'stats': None, 'expires_at': 0.0}
+
+def invalidate_dashboard_cache():
+    """Drops the cached dashboard stats after inventory/sales writes"""
+    _dashboard_cache['stats'] = None
+    _dashboard_cache['expires_at'] = 0.0
 
 def get_dashboard_stats():
     """
-    Calculates dashboard statistics
+    Calculates dashboard statistics (cached for a few seconds)
     Returns: dict with total stock, sales today, alerts
     """
-    # Total stock count
-    total_stock = db.session.query(db.func.sum(Medicine.stock_quantity)).scalar() or 0
-    
-    # Total sales today
+    if _dashboard_cache['stats'] is not None and time.monotonic() < _dashboard_cache['expires_at']:
+        return _dashboard_cache['stats']
+    # All scalar stats (stock total, sales today, alert counts) in a
+    # single round-trip instead of four separate queries
     today = date.today()
-    sales_today = db.session.query(db.func.sum(Sales.total_amount)).filter(
-        db.func.date(Sales.sale_date) == today
-    ).scalar() or 0
-    
-    # Low stock medicines (< threshold)
+    expiry_cutoff = today + timedelta(days=Config.EXPIRY_WARNING_DAYS)
+    counts = db.session.execute(text("""
+        SELECT
+            (SELECT SUM(stock_quantity) FROM medicines) AS total_stock,
+            (SELECT SUM(total_amount) FROM sales
+             WHERE sale_date >= :today AND sale_date < :tomorrow) AS sales_today,
+            (SELECT COUNT(*) FROM medicines
+             WHERE stock_quantity < :low_threshold) AS low_stock_count,
+            (SELECT COUNT(*) FROM medicines
+             WHERE expiry_date BETWEEN :today AND :expiry_cutoff) AS expiring_count
+    """), {
+        'today': today,
+        'tomorrow': today + timedelta(days=1),
+        'low_threshold': Config.LOW_STOCK_THRESHOLD,
+        'expiry_cutoff': expiry_cutoff
+    }).one()
+
+    # Low stock medicines (< threshold) - capped for rendering; the
+    # full count comes from the batched query above
     low_stock_medicines = Medicine.query.filter(
         Medicine.stock_quantity < Config.LOW_STOCK_THRESHOLD
-    ).all()
-    
-    # Expiring soon medicines (< 30 days)
-    expiring_soon = []
-    all_medicines = Medicine.query.all()
-    for med in all_medicines:
-        if med.is_expiring_soon(Config.EXPIRY_WARNING_DAYS):
-            expiring_soon.append(med)
+    ).order_by(Medicine.stock_quantity).limit(Config.DASHBOARD_LIST_LIMIT).all()
+
+    # Expiring soon medicines (< 30 days) - filtered in SQL so only
+    # matching rows are loaded instead of scanning the whole table
+    expiring_soon = Medicine.query.filter(
+        Medicine.expiry_date >= today,
+        Medicine.expiry_date <= expiry_cutoff
+    ).order_by(Medicine.expiry_date).limit(Config.DASHBOARD_LIST_LIMIT).all()
     
     # Seasonal recommendations
     current_season = get_current_season()
@@ -59,17 +116,40 @@ def get_dashboard_stats():
         Medicine.stock_quantity < 50  # Recommend stocking if low
     ).limit(10).all()
     
-    return {
-        'total_stock': int(total_stock),
-        'sales_today': round(sales_today, 2),
-        'low_stock_count': len(low_stock_medicines),
-        'expiring_count': len(expiring_soon),
+    stats = {
+        'total_stock': int(counts.total_stock or 0),
+        'sales_today': round(counts.sales_today or 0, 2),
+        'low_stock_count': counts.low_stock_count,
+        'expiring_count': counts.expiring_count,
         'low_stock_medicines': low_stock_medicines,
         'expiring_medicines': expiring_soon,
         'seasonal_medicines': seasonal_medicines,
         'current_season': current_season
     }
 
+    _dashboard_cache['stats'] = stats
+    _dashboard_cache['expires_at'] = time.monotonic() + Config.DASHBOARD_STATS_TTL
+    return stats
+
+def search_medicine_ids(search_query):
+    """
+    Full-text medicine search via the FTS5 index
+    Returns matching medicine ids, or None if the index is unavailable
+    (non-SQLite backend) so the caller can fall back to LIKE
+    """
+    # Quote each term and prefix-match it, e.g. 'para 500' -> '"para"* "500"*'
+    match_query = ' '.join(
+        f'"{term}"*' for term in search_query.replace('"', ' ').split()
+    )
+    try:
+        return db.session.execute(
+            text("SELECT rowid FROM medicine_fts WHERE medicine_fts MATCH :q"),
+            {'q': match_query}
+        ).scalars().all()
+    except Exception:
+        db.session.rollback()
+        return None
+
 # ============================================================================
 # ROUTES - DASHBOARD
 # ============================================================================
@@ -82,7 +162,7 @@ def dashboard():
     Displays: Total Stock, Sales Today, Expiring Medicines, Low Stock Alerts
     """
     stats = get_dashboard_stats()
-    return render_template('dashboard.html', stats=stats)
+    return render_template('dashboard.html', stats=stats, today=date.today())
 
 # ============================================================================
 # ROUTES - INVENTORY MANAGEMENT (CRUD)
@@ -95,21 +175,38 @@ def inventory():
     """
     # Get search query if provided
     search_query = request.args.get('search', '').strip()
-    
+    page = request.args.get('page', 1, type=int)
+
     if search_query:
-        # Search by name, manufacturer, or category
-        medicines = Medicine.query.filter(
-            or_(
-                Medicine.name.ilike(f'%{search_query}%'),
-                Medicine.manufacturer.ilike(f'%{search_query}%'),
-                Medicine.category.ilike(f'%{search_query}%')
-            )
-        ).order_by(Medicine.name).all()
+        # Search by name, manufacturer, or category via the FTS5
+        # inverted index; fall back to a LIKE scan if it's unavailable
+        matched_ids = search_medicine_ids(search_query)
+        if matched_ids is not None:
+            query = Medicine.query.filter(
+                Medicine.id.in_(matched_ids)
+            ).order_by(Medicine.name)
+        else:
+            query = Medicine.query.filter(
+                or_(
+                    Medicine.name.ilike(f'%{search_query}%'),
+                    Medicine.manufacturer.ilike(f'%{search_query}%'),
+                    Medicine.category.ilike(f'%{search_query}%')
+                )
+            ).order_by(Medicine.name)
     else:
         # Show all medicines
-        medicines = Medicine.query.order_by(Medicine.name).all()
-    
-    return render_template('inventory.html', medicines=medicines, search_query=search_query)
+        query = Medicine.query.order_by(Medicine.name)
+
+    # Paginate server-side so large inventories don't materialize
+    # every row on each page view
+    pagination = query.paginate(page=page, per_page=Config.INVENTORY_PAGE_SIZE,
+                                error_out=False)
+
+    # Compute today once for the expiry badges instead of calling
+    # days_until_expiry() (and date.today()) per rendered row
+    return render_template('inventory.html', medicines=pagination.items,
+                           pagination=pagination, search_query=search_query,
+                           today=date.today())
 
 @app.route('/inventory/add', methods=['GET', 'POST'])
 def add_medicine():
@@ -130,12 +227,8 @@ def add_medicine():
             expiry_date = datetime.strptime(expiry_date_str, '%Y-%m-%d').date()
             
             # Assign seasonal tag based on category
-            seasonal_tag = None
-            for season, categories in Config.SEASONAL_CATEGORIES.items():
-                if category in categories:
-                    seasonal_tag = season
-                    break
-            
+            seasonal_tag = Config.CATEGORY_TO_SEASON.get(category)
+
             # Create new medicine
             new_medicine = Medicine(
                 name=name,
@@ -149,7 +242,8 @@ def add_medicine():
             
             db.session.add(new_medicine)
             db.session.commit()
-            
+            invalidate_dashboard_cache()
+
             flash(f'✓ Medicine "{name}" added successfully!', 'success')
             return redirect(url_for('inventory'))
             
@@ -159,9 +253,7 @@ def add_medicine():
             return redirect(url_for('add_medicine'))
     
     # GET request - show form
-    categories = list(set([cat for cats in Config.SEASONAL_CATEGORIES.values() for cat in cats]))
-    categories.sort()
-    return render_template('add_medicine.html', categories=categories)
+    return render_template('add_medicine.html', categories=Config.ALL_CATEGORIES)
 
 @app.route('/inventory/edit/<int:id>', methods=['GET', 'POST'])
 def edit_medicine(id):
@@ -182,15 +274,11 @@ def edit_medicine(id):
             medicine.expiry_date = datetime.strptime(expiry_date_str, '%Y-%m-%d').date()
             
             # Update seasonal tag
-            seasonal_tag = None
-            for season, categories in Config.SEASONAL_CATEGORIES.items():
-                if medicine.category in categories:
-                    seasonal_tag = season
-                    break
-            medicine.seasonal_tag = seasonal_tag
+            medicine.seasonal_tag = Config.CATEGORY_TO_SEASON.get(medicine.category)
             
             db.session.commit()
-            
+            invalidate_dashboard_cache()
+
             flash(f'✓ Medicine "{medicine.name}" updated successfully!', 'success')
             return redirect(url_for('inventory'))
             
@@ -199,9 +287,7 @@ def edit_medicine(id):
             flash(f'❌ Error updating medicine: {str(e)}', 'danger')
     
     # GET request - show form with current data
-    categories = list(set([cat for cats in Config.SEASONAL_CATEGORIES.values() for cat in cats]))
-    categories.sort()
-    return render_template('edit_medicine.html', medicine=medicine, categories=categories)
+    return render_template('edit_medicine.html', medicine=medicine, categories=Config.ALL_CATEGORIES)
 
 @app.route('/inventory/delete/<int:id>', methods=['POST'])
 def delete_medicine(id):
@@ -214,7 +300,8 @@ def delete_medicine(id):
         
         db.session.delete(medicine)
         db.session.commit()
-        
+        invalidate_dashboard_cache()
+
         flash(f'✓ Medicine "{medicine_name}" deleted successfully!', 'success')
     except Exception as e:
         db.session.rollback()
@@ -243,7 +330,6 @@ def generate_invoice():
     """
     try:
         # Get cart data from form (JSON format)
-        import json
         cart_data = request.form.get('cart_data')
         
         if not cart_data:
@@ -256,51 +342,76 @@ def generate_invoice():
             flash('❌ Cart is empty!', 'danger')
             return redirect(url_for('billing'))
         
-        # Process each item in cart
+        # Parse the cart once into (medicine_id, quantity) pairs
+        cart_lines = [
+            (int(item['medicine_id']), int(item['quantity'])) for item in cart_items
+        ]
+
+        # Join the cart to medicines as an inline VALUES table so the
+        # per-line and invoice totals are computed in SQL, in a single
+        # round-trip, instead of Python arithmetic over ORM objects
+        values_clause = ', '.join(
+            f'(:mid{i}, :qty{i})' for i in range(len(cart_lines))
+        )
+        params = {}
+        for i, (medicine_id, quantity) in enumerate(cart_lines):
+            params[f'mid{i}'] = medicine_id
+            params[f'qty{i}'] = quantity
+
+        cart_rows = db.session.execute(text(f"""
+            WITH cart(medicine_id, quantity) AS (VALUES {values_clause})
+            SELECT m.id, m.name, m.price, m.stock_quantity, c.quantity,
+                   m.price * c.quantity AS line_total,
+                   SUM(m.price * c.quantity) OVER () AS invoice_total
+            FROM cart c
+            JOIN medicines m ON m.id = c.medicine_id
+        """), params).all()
+
+        # The join silently drops unknown ids - report the first one
+        if len(cart_rows) < len(cart_lines):
+            found_ids = {row.id for row in cart_rows}
+            missing_id = next(mid for mid, _ in cart_lines if mid not in found_ids)
+            flash(f'❌ Medicine ID {missing_id} not found!', 'danger')
+            return redirect(url_for('billing'))
+
+        # Process each cart line
         invoice_items = []
-        total_amount = 0
-        
-        for item in cart_items:
-            medicine_id = int(item['medicine_id'])
-            quantity = int(item['quantity'])
-            
-            # Get medicine
-            medicine = Medicine.query.get(medicine_id)
-            
-            if not medicine:
-                flash(f'❌ Medicine ID {medicine_id} not found!', 'danger')
-                return redirect(url_for('billing'))
-            
-            # Check stock availability
-            if medicine.stock_quantity < quantity:
-                flash(f'❌ Insufficient stock for {medicine.name}! Available: {medicine.stock_quantity}', 'danger')
-                return redirect(url_for('billing'))
-            
-            # Calculate amount
-            item_total = medicine.price * quantity
-            total_amount += item_total
-            
-            # Deduct stock
-            medicine.stock_quantity -= quantity
-            
-            # Record sale
-            sale = Sales(
-                medicine_id=medicine.id,
-                quantity_sold=quantity,
-                total_amount=item_total
+        sales_records = []
+        total_amount = cart_rows[0].invoice_total
+
+        for row in cart_rows:
+            # Deduct stock atomically - the WHERE clause guards against
+            # overselling, so there is no read-modify-write race
+            deducted = db.session.execute(
+                update(Medicine)
+                .where(Medicine.id == row.id,
+                       Medicine.stock_quantity >= row.quantity)
+                .values(stock_quantity=Medicine.stock_quantity - row.quantity)
             )
-            db.session.add(sale)
-            
+            if deducted.rowcount == 0:
+                db.session.rollback()
+                flash(f'❌ Insufficient stock for {row.name}! Available: {row.stock_quantity}', 'danger')
+                return redirect(url_for('billing'))
+
+            # Record sale (inserted in bulk after the loop)
+            sales_records.append(Sales(
+                medicine_id=row.id,
+                quantity_sold=row.quantity,
+                total_amount=row.line_total
+            ))
+
             # Add to invoice items
             invoice_items.append({
-                'name': medicine.name,
-                'quantity': quantity,
-                'price': medicine.price,
-                'total': item_total
+                'name': row.name,
+                'quantity': row.quantity,
+                'price': row.price,
+                'total': row.line_total
             })
         
-        # Commit all changes
+        # Insert all sales rows in one batched statement, then commit
+        db.session.bulk_save_objects(sales_records)
         db.session.commit()
+        invalidate_dashboard_cache()
         
         # Generate invoice number
         invoice_number = f"INV-{datetime.now().strftime('%Y%m%d%H%M%S')}"
@@ -330,14 +441,32 @@ def api_seasonal_recommendations():
     Returns JSON data
     """
     current_season = get_current_season()
+
+    # Cheap freshness probe: the recommendations only change when a
+    # seasonal medicine row changes, so an ETag over MAX(updated_at)
+    # lets most clients get a 304 without any serialization work
+    max_updated = db.session.execute(
+        select(func.max(Medicine.updated_at)).where(
+            Medicine.seasonal_tag == current_season
+        )
+    ).scalar_one()
+    etag = hashlib.md5(f'{current_season}:{max_updated}'.encode()).hexdigest()
+
+    if etag in request.if_none_match:
+        return '', 304
+
     medicines = Medicine.query.filter(
         Medicine.seasonal_tag == current_season
     ).limit(20).all()
-    
-    return jsonify({
+
+    response = jsonify({
         'season': current_season,
         'recommendations': [m.to_dict() for m in medicines]
     })
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.max_age = 60
+    return response
 
 @app.route('/api/medicine/<int:id>')
 def api_medicine_details(id):
@@ -21,6 +21,18 @@ class Config:
     
     # Disable SQLAlchemy modification tracking (saves resources)
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+
+    # Connection pooling - keep a pool of live connections instead of
+    # reconnecting per request; pre-ping discards stale ones
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_pre_ping': True,
+        'pool_size': 10,
+        'max_overflow': 20,
+    }
+    if SQLALCHEMY_DATABASE_URI.startswith('sqlite'):
+        # Allow pooled SQLite connections to be shared across the
+        # dev server's worker threads
+        SQLALCHEMY_ENGINE_OPTIONS['connect_args'] = {'check_same_thread': False}
     
     # CSV dataset path for seeding
     CSV_DATASET_PATH = os.path.join(BASE_DIR, 'medicines_dataset.csv')
@@ -28,6 +40,9 @@ class Config:
     # Business logic constants
     LOW_STOCK_THRESHOLD = 10  # Alert when stock falls below this
     EXPIRY_WARNING_DAYS = 30  # Alert when medicine expires within this many days
+    DASHBOARD_LIST_LIMIT = 20  # Max rows rendered per dashboard alert list
+    INVENTORY_PAGE_SIZE = 50  # Medicines shown per inventory page
+    DASHBOARD_STATS_TTL = 10  # Seconds to cache dashboard stats in-process
     
     # Seasonal mapping for intelligent recommendations
     # Maps medicine categories to seasons when they're most needed
@@ -38,6 +53,22 @@ class Config:
         'Spring': ['Antihistamine', 'Allergy Relief', 'Eye Drops', 'Nasal Spray']
     }
     
+    # Inverted mapping (category -> season) precomputed once at import
+    # so request handlers resolve tags with a single dict lookup.
+    # Iterating in reverse makes the first-listed season win for
+    # categories appearing under several (e.g. Antihistamine -> Summer),
+    # matching the original first-match loop
+    CATEGORY_TO_SEASON = {
+        category: season
+        for season, categories in reversed(SEASONAL_CATEGORIES.items())
+        for category in categories
+    }
+
+    # Sorted list of all known categories for form dropdowns
+    ALL_CATEGORIES = sorted({
+        category for categories in SEASONAL_CATEGORIES.values() for category in categories
+    })
+
     # Month to season mapping (for India - adjust based on region)
     MONTH_TO_SEASON = {
         1: 'Winter',   # January
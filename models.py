@@ -5,6 +5,7 @@ Purpose: SQLAlchemy ORM models for Medicine, Supplier, and Sales tables
 """
 
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 from datetime import datetime
 
 # Initialize SQLAlchemy instance
@@ -16,7 +17,13 @@ class Medicine(db.Model):
     This is the core table for the pharmacy inventory system
     """
     __tablename__ = 'medicines'
-    
+
+    # Composite index for the seasonal recommendation filter
+    # (seasonal_tag == season AND stock_quantity < threshold)
+    __table_args__ = (
+        db.Index('ix_med_season_stock', 'seasonal_tag', 'stock_quantity'),
+    )
+
     # Primary Key
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     
@@ -30,7 +37,7 @@ class Medicine(db.Model):
     stock_quantity = db.Column(db.Integer, nullable=False, default=0)
     
     # Expiry Management
-    expiry_date = db.Column(db.Date, nullable=False)
+    expiry_date = db.Column(db.Date, nullable=False, index=True)  # Indexed for expiry-range queries
     
     # Seasonal Tag (Winter, Summer, Monsoon, Spring)
     seasonal_tag = db.Column(db.String(50), nullable=True)
@@ -40,7 +47,11 @@ class Medicine(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationship with Sales
-    sales = db.relationship('Sales', backref='medicine', lazy=True, cascade='all, delete-orphan')
+    # The reverse 'medicine' side eager-loads via SELECT IN so that
+    # serializing a list of sales issues one batched query instead of
+    # one lazy SELECT per row
+    sales = db.relationship('Sales', backref=db.backref('medicine', lazy='selectin'),
+                            lazy=True, cascade='all, delete-orphan')
     
     def __repr__(self):
         return f'<Medicine {self.name} - Stock: {self.stock_quantity}>'
@@ -54,9 +65,9 @@ class Medicine(db.Model):
             'category': self.category,
             'price': self.price,
             'stock_quantity': self.stock_quantity,
-            'expiry_date': self.expiry_date.strftime('%Y-%m-%d'),
+            'expiry_date': self.expiry_date.isoformat(),
             'seasonal_tag': self.seasonal_tag,
-            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S')
+            'created_at': self.created_at.isoformat(sep=' ', timespec='seconds')
         }
     
     def days_until_expiry(self):
@@ -126,7 +137,7 @@ class Sales(db.Model):
     total_amount = db.Column(db.Float, nullable=False)
     
     # Sale Date
-    sale_date = db.Column(db.DateTime, default=datetime.utcnow)
+    sale_date = db.Column(db.DateTime, default=datetime.utcnow, index=True)  # Indexed for daily aggregation
     
     # Timestamps
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -142,10 +153,78 @@ class Sales(db.Model):
             'medicine_name': self.medicine.name if self.medicine else 'Unknown',
             'quantity_sold': self.quantity_sold,
             'total_amount': self.total_amount,
-            'sale_date': self.sale_date.strftime('%Y-%m-%d %H:%M:%S')
+            'sale_date': self.sale_date.isoformat(sep=' ', timespec='seconds')
         }
 
 
+def _set_sqlite_pragmas(dbapi_conn, _connection_record):
+    """
+    Tunes SQLite on every new connection
+    WAL lets readers proceed while billing commits; synchronous=NORMAL
+    drops the per-commit fsync cost (still durable under app crashes)
+    """
+    cursor = dbapi_conn.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.execute('PRAGMA temp_store=MEMORY')
+    cursor.execute('PRAGMA cache_size=-20000')  # ~20MB page cache
+    cursor.close()
+
+
+def _init_indexes():
+    """
+    Backfills indexes onto pre-existing tables
+    create_all() only creates missing tables, so databases created
+    before an index was declared never pick it up - these statements
+    bring an existing file up to the current schema
+    """
+    statements = [
+        "CREATE INDEX IF NOT EXISTS ix_medicines_expiry_date ON medicines (expiry_date)",
+        "CREATE INDEX IF NOT EXISTS ix_med_season_stock ON medicines (seasonal_tag, stock_quantity)",
+        "CREATE INDEX IF NOT EXISTS ix_sales_sale_date ON sales (sale_date)",
+    ]
+    for statement in statements:
+        db.session.execute(db.text(statement))
+    db.session.commit()
+
+
+def _init_search_index():
+    """
+    Creates the FTS5 full-text index over medicines (SQLite only)
+    Triggers keep the index in sync with inserts/updates/deletes,
+    so /inventory search uses an inverted index instead of a full scan
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return
+
+    statements = [
+        """CREATE VIRTUAL TABLE IF NOT EXISTS medicine_fts USING fts5(
+            name, manufacturer, category,
+            content='medicines', content_rowid='id'
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS medicines_fts_ai AFTER INSERT ON medicines BEGIN
+            INSERT INTO medicine_fts(rowid, name, manufacturer, category)
+            VALUES (new.id, new.name, new.manufacturer, new.category);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS medicines_fts_ad AFTER DELETE ON medicines BEGIN
+            INSERT INTO medicine_fts(medicine_fts, rowid, name, manufacturer, category)
+            VALUES ('delete', old.id, old.name, old.manufacturer, old.category);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS medicines_fts_au
+        AFTER UPDATE OF name, manufacturer, category ON medicines BEGIN
+            INSERT INTO medicine_fts(medicine_fts, rowid, name, manufacturer, category)
+            VALUES ('delete', old.id, old.name, old.manufacturer, old.category);
+            INSERT INTO medicine_fts(rowid, name, manufacturer, category)
+            VALUES (new.id, new.name, new.manufacturer, new.category);
+        END""",
+        # Resync with any rows inserted while the index did not exist
+        "INSERT INTO medicine_fts(medicine_fts) VALUES ('rebuild')",
+    ]
+    for statement in statements:
+        db.session.execute(db.text(statement))
+    db.session.commit()
+
+
 def init_db(app):
     """
     Initialize database with Flask app
@@ -153,5 +232,9 @@ def init_db(app):
     """
     db.init_app(app)
     with app.app_context():
+        if db.engine.dialect.name == 'sqlite':
+            event.listen(db.engine, 'connect', _set_sqlite_pragmas)
         db.create_all()
+        _init_indexes()
+        _init_search_index()
         print("[OK] Database initialized successfully!")
@@ -5,9 +5,12 @@ Purpose: Reads CSV file and populates database with 1000+ medicine records
 Features: Data cleaning, validation, seasonal tagging, and bulk insertion
 """
 
+import numpy as np
 import pandas as pd
-import random
+import queue
+import threading
 from datetime import datetime, timedelta
+from datetime import date
 from models import db, Medicine, Supplier
 from config import Config
 import os
@@ -40,200 +43,376 @@ MANUFACTURERS = [
     'Novartis', 'Bayer', 'Dabur', 'Himalaya', 'HealthKart', 'P&G', 'Centaur'
 ]
 
-def assign_seasonal_tag(category):
-    """
-    Assigns seasonal tag based on medicine category
-    Uses the seasonal mapping from config
-    """
-    for season, categories in Config.SEASONAL_CATEGORIES.items():
-        if category in categories:
-            return season
-    return None  # No specific season
+# Fixed lookup tables hoisted to module scope so generate_medicines
+# doesn't rebuild them on every call
+_CATEGORIES = tuple(MEDICINE_DATA.keys())
+_DOSAGES = ('50mg', '100mg', '250mg', '500mg', '1000mg', '10ml', '100ml', '200ml')
+_FORMS = ('Tablet', 'Capsule', 'Syrup', 'Suspension', 'Drops', 'Cream', 'Ointment')
 
-def generate_random_expiry_date():
+def _generate_expiry_dates(count, rng):
     """
-    Generates random expiry date
+    Draws a whole batch of expiry dates in one vectorized pass
     70% future dates (6 months to 2 years)
-    20% near expiry (1-30 days)
-    10% recently expired
+    20% near expiry (1-30 days, for testing alerts)
+    10% recently expired (for testing)
+    Returns a numpy datetime64[D] array
     """
-    rand = random.random()
-    today = datetime.now().date()
-    
-    if rand < 0.70:  # Future dates
-        days_ahead = random.randint(180, 730)  # 6 months to 2 years
-        return today + timedelta(days=days_ahead)
-    elif rand < 0.90:  # Near expiry (for testing alerts)
-        days_ahead = random.randint(1, 30)
-        return today + timedelta(days=days_ahead)
-    else:  # Recently expired (for testing)
-        days_behind = random.randint(1, 60)
-        return today - timedelta(days=days_behind)
+    rand = rng.random(count)
+    days = np.where(
+        rand < 0.70, rng.integers(180, 731, count),
+        np.where(rand < 0.90, rng.integers(1, 31, count),
+                 -rng.integers(1, 61, count))
+    )
+    return np.datetime64(datetime.now().date()) + days.astype('timedelta64[D]')
 
 def generate_medicines(count=1000):
     """
     Generates specified number of medicine records
-    Returns a list of dictionaries
+    All random fields are drawn in bulk with NumPy (one C call per
+    column instead of per-row random.choice/randint/uniform)
+    Returns a DataFrame assembled column-by-column, so every column
+    is one contiguous array rather than N boxed row dicts
     """
-    medicines = []
-    
-    for i in range(count):
-        # Randomly select category and medicine name
-        category = random.choice(list(MEDICINE_DATA.keys()))
-        base_name = random.choice(MEDICINE_DATA[category])
-        
-        # Add variations (dosage, form)
-        dosages = ['50mg', '100mg', '250mg', '500mg', '1000mg', '10ml', '100ml', '200ml']
-        forms = ['Tablet', 'Capsule', 'Syrup', 'Suspension', 'Drops', 'Cream', 'Ointment']
-        
-        # 60% with dosage, 30% with form, 10% plain
-        rand = random.random()
-        if rand < 0.60:
-            name = f"{base_name} {random.choice(dosages)}"
-        elif rand < 0.90:
-            name = f"{base_name} {random.choice(forms)}"
+    rng = np.random.default_rng()
+
+    # Draw every random field for the whole batch at once
+    categories = rng.choice(_CATEGORIES, size=count)
+    name_indices = rng.integers(0, 10, size=count)  # All category lists hold 10 names
+    variants = rng.random(count)  # 60% with dosage, 30% with form, 10% plain
+    dosage_picks = rng.choice(_DOSAGES, size=count)
+    form_picks = rng.choice(_FORMS, size=count)
+    manufacturers = rng.choice(MANUFACTURERS, size=count)
+    prices = np.round(rng.uniform(10.0, 500.0, count), 2)
+    stock_quantities = rng.integers(0, 201, count)  # Some will be low stock
+
+    # datetime64[D].tolist() yields plain datetime.date objects
+    expiry_dates = _generate_expiry_dates(count, rng).tolist()
+
+    # Name assembly is the only per-row string work left
+    names = []
+    for category, name_idx, variant, dosage, form in zip(
+            categories, name_indices, variants, dosage_picks, form_picks):
+        base_name = MEDICINE_DATA[category][name_idx]
+        if variant < 0.60:
+            names.append(f"{base_name} {dosage}")
+        elif variant < 0.90:
+            names.append(f"{base_name} {form}")
         else:
-            name = base_name
-        
-        # Generate other fields
-        manufacturer = random.choice(MANUFACTURERS)
-        price = round(random.uniform(10.0, 500.0), 2)
-        stock_quantity = random.randint(0, 200)  # Some will be low stock
-        expiry_date = generate_random_expiry_date()
-        seasonal_tag = assign_seasonal_tag(category)
-        
-        medicines.append({
+            names.append(base_name)
+
+    return pd.DataFrame({
+        'name': names,
+        'manufacturer': manufacturers,
+        'category': categories,
+        # Narrow dtypes: prices fit float32, stock (0-200) fits int16,
+        # halving the memory traffic of every later column scan
+        'price': prices.astype(np.float32),
+        'stock_quantity': stock_quantities.astype(np.int16),
+        'expiry_date': expiry_dates
+    })
+
+# Rows per CSV chunk - keeps peak memory at O(chunk) so arbitrarily
+# large input files can be seeded
+SEED_CHUNK_SIZE = 50_000
+
+# Insert statements built once and reused across batches so the
+# table/column metadata isn't re-walked per chunk
+MEDICINE_INSERT = Medicine.__table__.insert()
+SUPPLIER_INSERT = Supplier.__table__.insert()
+
+# One set-oriented UPDATE resolving every row's seasonal tag from its
+# category, replacing the per-row Python tagging pass at seed time
+SEASONAL_TAG_UPDATE = db.update(Medicine).values(
+    seasonal_tag=db.case(Config.CATEGORY_TO_SEASON, value=Medicine.category, else_=None)
+)
+
+def _clear_table(model):
+    """
+    Empties a table without per-row ORM cascade bookkeeping
+    TRUNCATE on Postgres frees the table in O(1); other dialects get
+    a single plain DELETE statement
+    """
+    if db.engine.dialect.name == 'postgresql':
+        db.session.execute(
+            db.text(f'TRUNCATE {model.__tablename__} RESTART IDENTITY CASCADE')
+        )
+    else:
+        db.session.execute(model.__table__.delete())
+
+def _clean_chunk(df, seen_keys, rng):
+    """
+    Cleans one batch of CSV rows (dedup, missing values, tagging)
+    seen_keys carries (name, manufacturer) hashes across chunks so
+    duplicates are dropped globally, not just within a chunk
+    """
+    # Remove duplicates - dedup on a single uint64 hash of the
+    # (name, manufacturer) key so each string pair is hashed
+    # once instead of re-hashed per comparison column
+    original_count = len(df)
+    dedup_key = pd.util.hash_pandas_object(
+        df[['name', 'manufacturer']], index=False
+    )
+    fresh = ~(dedup_key.duplicated() | dedup_key.isin(seen_keys))
+    seen_keys.update(dedup_key[fresh].tolist())
+    df = df.loc[fresh].copy()
+    if len(df) < original_count:
+        print(f"  - Removed {original_count - len(df)} duplicate records")
+
+    # Handle missing values in one assign pass (the chained
+    # inplace fillna calls are deprecated under copy-on-write)
+    price_median = df['price'].median()
+    df = df.assign(
+        manufacturer=df['manufacturer'].fillna('Unknown'),
+        category=df['category'].fillna('General'),
+        price=df['price'].fillna(price_median)
+    )
+
+    # Assign random expiry dates if missing (drawn in bulk)
+    if 'expiry_date' in df.columns:
+        df['expiry_date'] = pd.to_datetime(df['expiry_date'], errors='coerce')
+        missing_dates = df['expiry_date'].isna().sum()
+        if missing_dates > 0:
+            print(f"  - Assigning random expiry dates to {missing_dates} records")
+            df.loc[df['expiry_date'].isna(), 'expiry_date'] = \
+                _generate_expiry_dates(missing_dates, rng)
+    else:
+        print("  - No expiry_date column found, generating random dates")
+        df['expiry_date'] = _generate_expiry_dates(len(df), rng)
+
+    # Add stock quantity if missing (drawn in bulk)
+    if 'stock_quantity' not in df.columns:
+        df['stock_quantity'] = rng.integers(0, 201, len(df))
+
+    # Downcast numerics to match the generated dataset's dtypes
+    df['price'] = df['price'].astype('float32')
+    df['stock_quantity'] = df['stock_quantity'].astype('int16')
+
+    # Seasonal tags are resolved in SQL after insertion (see
+    # SEASONAL_TAG_UPDATE), so no tagging pass is needed here
+
+    # Dictionary-encode the low-cardinality string columns
+    # (~20 unique values each): integer codes plus a small
+    # lookup table instead of a Python string object per cell.
+    # Cast after cleaning so fillna can still introduce values
+    for col in ('manufacturer', 'category'):
+        df[col] = df[col].astype('category')
+
+    return df
+
+def _insert_batch(df):
+    """
+    Bulk-inserts one cleaned batch of medicines
+    Zipping plain column lists avoids the per-row Series boxing
+    that iterrows/to_dict-style row access pays
+    Returns the number of inserted records
+    """
+    records = [
+        {
             'name': name,
             'manufacturer': manufacturer,
             'category': category,
             'price': price,
-            'stock_quantity': stock_quantity,
-            'expiry_date': expiry_date,
-            'seasonal_tag': seasonal_tag
-        })
-    
-    return medicines
+            'stock_quantity': quantity,
+            'expiry_date': expiry_date
+        }
+        for name, manufacturer, category, price, quantity, expiry_date in zip(
+            df['name'].tolist(),
+            df['manufacturer'].tolist(),
+            df['category'].tolist(),
+            # Rounded after widening so the float32 in-memory columns
+            # never leak representational noise (296.1700134...) into
+            # stored monetary values
+            df['price'].astype(float).round(2).tolist(),
+            df['stock_quantity'].astype(int).tolist(),
+            # Normalized once for the whole batch
+            pd.to_datetime(df['expiry_date']).dt.date.tolist()
+        )
+    ]
+    # A chunk can dedup down to nothing; executing an insert with an
+    # empty parameter list would insert a single defaults-only row
+    if not records:
+        return 0
+
+    # Core-level executemany - skips ORM mapper bookkeeping entirely
+    # and rides the driver's batched-INSERT fast path
+    db.session.execute(MEDICINE_INSERT, records)
+    return len(records)
+
+def _write_dataset_cache(df, parquet_path, csv_path):
+    """
+    Persists a generated dataset for the next run
+    Prefers Parquet; falls back to CSV when no parquet engine is installed
+    Runs on a background thread so the seed path never waits on disk
+    Writes to a temp file and renames into place so a crash mid-write
+    can never leave a truncated cache behind
+    """
+    tmp_path = parquet_path + '.tmp'
+    try:
+        try:
+            df.to_parquet(tmp_path, compression='snappy')
+        except ImportError:
+            # No parquet engine installed - fall back to CSV
+            tmp_path = csv_path + '.tmp'
+            df.to_csv(tmp_path, index=False)
+            os.replace(tmp_path, csv_path)
+            return
+        os.replace(tmp_path, parquet_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
 
 def seed_from_csv(app, csv_path):
     """
     Reads CSV file and seeds database
-    Handles data cleaning and validation
+    Streams user CSVs chunk by chunk so peak memory stays bounded
+    regardless of input size
     """
     print("\n" + "="*60)
     print("SMART PHARMACY SEEDING SCRIPT")
     print("="*60)
     
+    # Generated datasets are cached as Parquet - typed binary columns
+    # reload several times faster than re-parsing CSV text. A
+    # user-supplied CSV always takes priority over the cache
+    parquet_path = os.path.splitext(csv_path)[0] + '.parquet'
+
+    # df stays None when a user CSV exists - that path streams the
+    # file in chunks below instead of loading it whole
+    df = None
+    cache_writer = None
+
     # Check if CSV exists
     if not os.path.exists(csv_path):
-        print(f"⚠ CSV file not found at: {csv_path}")
-        print("📝 Generating sample dataset...")
-        
-        # Generate medicines programmatically
-        medicines_data = generate_medicines(1000)
-        
-        # Create DataFrame
-        df = pd.DataFrame(medicines_data)
-        
-        # Save to CSV for reference
-        df.to_csv(csv_path, index=False)
-        print(f"✓ Generated CSV with {len(df)} records")
-    else:
-        print(f"📂 Reading CSV from: {csv_path}")
-        
-        try:
-            # Read CSV with pandas
-            df = pd.read_csv(csv_path)
-            print(f"✓ Loaded {len(df)} records from CSV")
-            
-            # Data cleaning
-            print("\n🧹 Cleaning data...")
-            
-            # Remove duplicates
-            original_count = len(df)
-            df = df.drop_duplicates(subset=['name', 'manufacturer'], keep='first')
-            if len(df) < original_count:
-                print(f"  - Removed {original_count - len(df)} duplicate records")
-            
-            # Handle missing values
-            df['manufacturer'].fillna('Unknown', inplace=True)
-            df['category'].fillna('General', inplace=True)
-            df['price'].fillna(df['price'].median(), inplace=True)
-            
-            # Assign random expiry dates if missing
-            if 'expiry_date' in df.columns:
-                df['expiry_date'] = pd.to_datetime(df['expiry_date'], errors='coerce')
-                missing_dates = df['expiry_date'].isna().sum()
-                if missing_dates > 0:
-                    print(f"  - Assigning random expiry dates to {missing_dates} records")
-                    df.loc[df['expiry_date'].isna(), 'expiry_date'] = [
-                        generate_random_expiry_date() for _ in range(missing_dates)
-                    ]
-            else:
-                print("  - No expiry_date column found, generating random dates")
-                df['expiry_date'] = [generate_random_expiry_date() for _ in range(len(df))]
-            
-            # Add stock quantity if missing
-            if 'stock_quantity' not in df.columns:
-                df['stock_quantity'] = [random.randint(0, 200) for _ in range(len(df))]
-            
-            # Assign seasonal tags
-            df['seasonal_tag'] = df['category'].apply(assign_seasonal_tag)
-            
-            print("✓ Data cleaning complete")
-            
-        except Exception as e:
-            print(f"❌ Error reading CSV: {e}")
-            print("📝 Generating sample dataset instead...")
-            medicines_data = generate_medicines(1000)
-            df = pd.DataFrame(medicines_data)
-    
+        if os.path.exists(parquet_path):
+            print(f"📂 Reading cached dataset from: {parquet_path}")
+            try:
+                df = pd.read_parquet(parquet_path)
+                print(f"✓ Loaded {len(df)} records from cache")
+            except Exception as e:
+                # An unreadable cache must never wedge seeding - drop
+                # it and fall through to regeneration
+                print(f"⚠ Cache unreadable ({e}) - regenerating")
+                os.remove(parquet_path)
+        if df is None:
+            print(f"⚠ CSV file not found at: {csv_path}")
+            print("📝 Generating sample dataset...")
+
+            # Generate medicines programmatically
+            df = generate_medicines(1000)
+
+            # Cache for the next run - written in the background so the
+            # insert phase starts immediately instead of waiting on
+            # disk; joined before returning so the write completes
+            cache_writer = threading.Thread(
+                target=_write_dataset_cache,
+                args=(df, parquet_path, csv_path),
+                daemon=True,
+            )
+            cache_writer.start()
+            print(f"✓ Generated {len(df)} records (caching in background)")
     # Insert into database
-    print(f"\n💾 Inserting {len(df)} records into database...")
-    
+    print("\n💾 Inserting records into database...")
+
     with app.app_context():
         try:
             # Clear existing data (optional - comment out to preserve existing data)
-            Medicine.query.delete()
+            _clear_table(Medicine)
             db.session.commit()
             print("  - Cleared existing medicine records")
-            
-            # Bulk insert
-            inserted_count = 0
-            for _, row in df.iterrows():
-                medicine = Medicine(
-                    name=row['name'],
-                    manufacturer=row['manufacturer'],
-                    category=row['category'],
-                    price=float(row['price']),
-                    stock_quantity=int(row.get('stock_quantity', random.randint(0, 200))),
-                    expiry_date=row['expiry_date'] if isinstance(row['expiry_date'], datetime) else pd.to_datetime(row['expiry_date']).date(),
-                    seasonal_tag=row.get('seasonal_tag')
-                )
-                db.session.add(medicine)
-                inserted_count += 1
-                
-                # Commit in batches of 100 for performance
-                if inserted_count % 100 == 0:
+
+            if df is not None:
+                # Generated / cached dataset - already clean, one batch
+                inserted_count = _insert_batch(df)
+                db.session.commit()
+            else:
+                # Stream the user CSV: read, clean, and insert one
+                # chunk at a time so peak memory is O(chunk), not
+                # O(file); each chunk commits before the next is read
+                print(f"📂 Reading CSV from: {csv_path}")
+                print("🧹 Cleaning data...")
+                rng = np.random.default_rng()
+                seen_keys = set()
+                inserted_count = 0
+
+                # Producer/consumer pipeline: a reader thread parses the
+                # next CSV chunk while this thread cleans and inserts
+                # the previous one, overlapping disk I/O with DB
+                # latency. The bounded queue caps in-flight chunks at
+                # two; read errors are handed over and re-raised here
+                # so the fallback below still applies. The session is
+                # only ever touched from this thread
+                chunk_queue = queue.Queue(maxsize=2)
+
+                def _read_chunks():
+                    try:
+                        for chunk in pd.read_csv(csv_path, chunksize=SEED_CHUNK_SIZE):
+                            chunk_queue.put(chunk)
+                    except Exception as exc:
+                        chunk_queue.put(exc)
+                        return
+                    chunk_queue.put(None)  # End-of-file sentinel
+
+                reader = threading.Thread(target=_read_chunks, daemon=True)
+                reader.start()
+                read_failed = False
+                while True:
+                    # Only read/clean failures take the generate-instead
+                    # fallback; insert/commit errors fall through to the
+                    # outer handler, which rolls back and aborts loudly
+                    try:
+                        item = chunk_queue.get()
+                        if item is None:
+                            break
+                        if isinstance(item, Exception):
+                            raise item
+                        chunk = _clean_chunk(item, seen_keys, rng)
+                    except Exception as e:
+                        print(f"❌ Error reading CSV: {e}")
+                        print("📝 Generating sample dataset instead...")
+                        db.session.rollback()
+                        _clear_table(Medicine)
+                        df = generate_medicines(1000)
+                        inserted_count = _insert_batch(df)
+                        db.session.commit()
+                        read_failed = True
+                        break
+                    inserted_count += _insert_batch(chunk)
                     db.session.commit()
                     print(f"  - Inserted {inserted_count} records...")
-            
-            # Final commit
+                if not read_failed:
+                    # The abandoned reader is a daemon thread; only a
+                    # clean run has a finished producer to join
+                    reader.join()
+
+            # Resolve seasonal tags for the whole table with one
+            # set-oriented CASE update instead of a Python column pass
+            db.session.execute(SEASONAL_TAG_UPDATE)
             db.session.commit()
+
             print(f"\n✓ Successfully inserted {inserted_count} medicine records!")
             
             # Statistics
             print("\n" + "="*60)
             print("DATABASE STATISTICS")
             print("="*60)
+            today = date.today()
+            expiry_cutoff = today + timedelta(days=Config.EXPIRY_WARNING_DAYS)
             print(f"Total Medicines: {Medicine.query.count()}")
-            print(f"Low Stock Items: {Medicine.query.filter(Medicine.stock_quantity < 10).count()}")
-            print(f"Expiring Soon: {len([m for m in Medicine.query.all() if m.is_expiring_soon()])}")
+            print(f"Low Stock Items: {Medicine.query.filter(Medicine.stock_quantity < Config.LOW_STOCK_THRESHOLD).count()}")
+            print(f"Expiring Soon: {Medicine.query.filter(Medicine.expiry_date.between(today, expiry_cutoff)).count()}")
             print("="*60 + "\n")
             
         except Exception as e:
             db.session.rollback()
             print(f"❌ Error inserting data: {e}")
             raise
+        finally:
+            # Don't let interpreter shutdown kill the cache write
+            # mid-file; by now the inserts are done, so this only
+            # waits out whatever disk time is still outstanding
+            if cache_writer is not None:
+                cache_writer.join()
 
 def seed_suppliers(app):
     """
@@ -251,10 +430,8 @@ def seed_suppliers(app):
     
     with app.app_context():
         try:
-            Supplier.query.delete()
-            for supplier_data in sample_suppliers:
-                supplier = Supplier(**supplier_data)
-                db.session.add(supplier)
+            _clear_table(Supplier)
+            db.session.execute(SUPPLIER_INSERT, sample_suppliers)
             db.session.commit()
             print(f"✓ Inserted {len(sample_suppliers)} suppliers\n")
         except Exception as e: